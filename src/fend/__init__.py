@@ -1,6 +1,31 @@
 import abc
+import codecs
+import hashlib
+import mmap
+import os
+import re
+from array import array
+from bisect import bisect_right
+from collections.abc import Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, overload
+
+# The number of threads used to read files concurrently; the threads spend nearly all
+# of their time waiting on I/O, so there can be more of them than there are CPUs.
+_PRIME_THREADS = 32
+
+_NEWLINE = re.compile(b'\n')
+
+# The default size (in bytes) above which files are not checked.
+MAX_FILE_SIZE = 1024 * 1024
+# The number of bytes at the start of a file that are examined to see if it is binary.
+_SNIFF_SIZE = 4096
+# Files at least this large (in bytes) are memory mapped instead of read.
+_MMAP_SIZE = 4096
+# The size of the chunks in which files are read while hashing them.
+_HASH_CHUNK_SIZE = 1024 * 1024
 
 
 class File:
@@ -10,18 +35,161 @@ class File:
 
     def __init__(self, path: Path | str, text: str | None = None) -> None:
         self.path = Path(path)
+        # The contents are read lazily and then kept (undecoded) so that repeated access
+        # (by multiple patterns, or while fixing) does not go back to the disk.
+        self._raw: bytes | mmap.mmap | None = (
+            None if text is None else text.encode('utf-8')
+        )
+        # The offset at which each line starts, plus the offset of the end of the last
+        # line; computed on first use.
+        self._line_starts: 'array[int] | None' = None
+        self._is_binary: bool | None = None
+        self._digest: bytes | None = None
+
+    @property
+    def raw(self) -> bytes | mmap.mmap:
+        """The contents of the file as (undecoded) bytes.
+
+        Larger files are memory mapped rather than read, so their contents are only paged
+        in as they are used.  Note that mmap objects only support "in" for single bytes;
+        use find() to search for byte strings.
+        """
+        if self._raw is None:
+            with self.path.open('rb') as f:
+                if os.fstat(f.fileno()).st_size < _MMAP_SIZE:
+                    self._raw = f.read()
+                else:
+                    self._raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._raw
+
+    @property
+    def text(self) -> str:
+        return str(self.raw, 'utf-8')
+
+    @property
+    def size(self) -> int:
+        """The size of the file's contents, in bytes."""
+        if self._raw is None:
+            return self.path.stat().st_size
+        return len(self._raw)
+
+    @property
+    def is_binary(self) -> bool:
+        """Whether the file appears to contain something other than UTF-8 text.
+
+        Only the start of the file is examined, so the file is not read in full.
+        """
+        if self._is_binary is None:
+            if self._raw is None:
+                with self.path.open('rb') as f:
+                    head = f.read(_SNIFF_SIZE)
+            else:
+                head = self._raw[:_SNIFF_SIZE]
+            try:
+                # The decoder is not told that this is the end of the input so that a
+                # character cut in half by the end of the sample is not an error.
+                codecs.getincrementaldecoder('utf-8')().decode(head)
+            except UnicodeDecodeError:
+                self._is_binary = True
+            else:
+                self._is_binary = b'\0' in head
+        return self._is_binary
+
+    @property
+    def digest(self) -> bytes:
+        """A SHA-256 hash of the file's contents.
+
+        If the contents have not been read yet they are hashed as they are read, a chunk
+        at a time, rather than being read in full.
+        """
+        if self._digest is None:
+            digest = hashlib.sha256()
+            if self._raw is None:
+                with self.path.open('rb') as f:
+                    while chunk := f.read(_HASH_CHUNK_SIZE):
+                        digest.update(chunk)
+            else:
+                digest.update(self._raw)
+            self._digest = digest.digest()
+        return self._digest
 
-    
     @property
-    def text(self):
-        return self.path.read_text('utf-8')
+    def lines(self) -> Sequence[str]:
+        """The lines of the file; each line is only decoded when it is accessed."""
+        return _Lines(self)
 
     @property
-    def lines(self) -> list[str]:
-        return self.text.splitlines(keepends=True)
+    def line_count(self) -> int:
+        return len(self._get_line_starts()) - 1
+
+    def _get_line_starts(self) -> 'array[int]':
+        if self._line_starts is None:
+            raw = self.raw
+            line_starts = array('q', [0])
+            line_starts.extend(match.end() for match in _NEWLINE.finditer(raw))
+            if line_starts[-1] != len(raw):
+                # The last line does not end with a newline.
+                line_starts.append(len(raw))
+            self._line_starts = line_starts
+        return self._line_starts
+
+    def line_of(self, offset: int) -> int:
+        """Find the number of the line containing the given (byte) offset."""
+        return bisect_right(self._get_line_starts(), offset)
+
+    def write_lines(self, lines: list[str]) -> None:
+        """Replace the contents of the file, both on disk and in memory."""
+        # A mapping of the file must not outlive the file being rewritten.
+        self.close()
+        self._raw = ''.join(lines).encode('utf-8')
+        self._line_starts = None
+        self._digest = None
+        self.path.write_bytes(self._raw)
+
+    def get_line(self, line_no: int) -> str:
+        line_starts = self._get_line_starts()
+        return self.raw[line_starts[line_no - 1] : line_starts[line_no]].decode('utf-8')
+
+    def close(self) -> None:
+        """Release the file's memory mapping, if it has one."""
+        if isinstance(self._raw, mmap.mmap):
+            self._raw.close()
+            self._raw = None
+            self._line_starts = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        if isinstance(self._raw, mmap.mmap):
+            # Mappings can not be pickled; the contents will be mapped again when needed.
+            state['_raw'] = None
+        return state
+
+
+class _Lines(Sequence[str]):
+    """A read-only view of the lines of a file."""
+
+    def __init__(self, file: File) -> None:
+        self._file = file
+
+    def __len__(self) -> int:
+        return self._file.line_count
+
+    @overload
+    def __getitem__(self, index: int) -> str:
+        ...
 
-    def get_line(self, line_no: int):
-        return self.lines[line_no - 1]
+    @overload
+    def __getitem__(self, index: slice) -> list[str]:
+        ...
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('line index out of range')
+        return self._file.get_line(index + 1)
 
 
 class Project:
@@ -33,6 +201,10 @@ class Project:
         project.files = [File(path)]
         return project
 
+    @classmethod
+    def from_file_paths(cls, paths: list[str | Path]) -> 'Project':
+        return cls.from_files([File(path) for path in paths])
+
     @classmethod
     def from_files(cls, files: list[File]) -> 'Project':
         project = cls()
@@ -43,8 +215,44 @@ class Project:
     def from_text(cls, text: str):
         return Project.from_files([File(path='/tmp/fake/path', text=text)])
 
+    # Files larger than this (in bytes) are not checked.
+    max_file_size = MAX_FILE_SIZE
+
+    def __enter__(self) -> 'Project':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        for file in self.files:
+            file.close()
+
+    def get_files(self) -> list[File]:
+        """Find the files to be checked; binary and oversized files are skipped."""
+        return [
+            file
+            for file in self.files
+            if not file.is_binary and file.size <= self.max_file_size
+        ]
 
-@dataclass(frozen=True)
+    def prime(self) -> None:
+        """Read the contents of all of the project's files ahead of them being used.
+
+        The reads are issued concurrently so that their latency overlaps instead of
+        adding up one file at a time.
+        """
+        with ThreadPoolExecutor(max_workers=_PRIME_THREADS) as executor:
+            # Consume the results so that all reads finish before returning.
+            list(executor.map(_prime_file, self.get_files()))
+
+
+def _prime_file(file: File) -> None:
+    try:
+        file.raw
+    except OSError:
+        # The error will be reported when (if) the file is actually used.
+        pass
+
+
+@dataclass(frozen=True, slots=True)
 class Location:
     """A file, line, and optionally column location."""
 
@@ -52,11 +260,15 @@ class Location:
     line: int  # line numbers start at 1
     column: int | None  # column numbers start at 1
 
-    def __post_init__(self) -> None:
-        assert self.line is None or self.line >= 1, 'line numbers start at 1'
-        assert self.column is None or self.column >= 1, 'column numbers start at 1'
-        if self.line is not None:
-            assert self.column is not None, 'line and column must both be None or not'
+    if __debug__:
+
+        def __post_init__(self) -> None:
+            assert self.line is None or self.line >= 1, 'line numbers start at 1'
+            assert self.column is None or self.column >= 1, 'column numbers start at 1'
+            if self.line is not None:
+                assert (
+                    self.column is not None
+                ), 'line and column must both be None or not'
 
     @property
     def file(self) -> File:
@@ -72,17 +284,68 @@ class Pattern(abc.ABC):
 
     id: str  # e.g., 'trailing-whitespace'
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """Verify that the pattern does not break any known rules.
+
+        This happens once, when the pattern class is defined.
+        """
+        super().__init_subclass__(**kwargs)
+        # Abstract base classes for patterns may not have an ID.
+        if hasattr(cls, 'id'):
+            assert ' ' not in cls.id, 'IDs may not contain spaces'
+
     @abc.abstractmethod
-    def check(self, project: Project) -> list['Violation']:
+    def check(self, project: Project) -> Iterator['Violation']:
         ...
 
-    def validate(self) -> None:
-        """Verify that the pattern does not break any known rules."""
-        assert ' ' not in self.id
-        assert ' ' not in self.id, 'IDs may not contain spaces'
+    def fingerprint(self) -> bytes:
+        """Identify any data, other than its code, that the pattern's results depend on.
+
+        Cached results are only reused while this stays the same.
+        """
+        return b''
+
+
+class RegexPattern(Pattern):
+    """A pattern whose violations are found by searching files with a regex.
+
+    Subclasses provide the regex (which is compiled once, when the class is defined) and
+    turn each match into a violation.
+    """
+
+    regex: bytes
+    # If given, at least one of these must appear in a file for the regex to match.  They
+    # are cheap to search for, so files without any of them are skipped without running
+    # the regex.
+    required_substrings: tuple[bytes, ...] = ()
 
+    _compiled: re.Pattern[bytes]
 
-@dataclass(frozen=True)
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        if hasattr(cls, 'regex'):
+            cls._compiled = re.compile(cls.regex)
+
+    def check(self, project: Project) -> Iterator['Violation']:
+        for file in project.get_files():
+            raw = file.raw
+            if not self.may_match(raw):
+                continue
+            for match in self._compiled.finditer(raw):
+                yield self.make_violation(file, match)
+
+    def may_match(self, raw: Any) -> bool:
+        """Decide cheaply whether the regex could match the contents of a file."""
+        return not self.required_substrings or any(
+            raw.find(substring) != -1 for substring in self.required_substrings
+        )
+
+    @abc.abstractmethod
+    def make_violation(self, file: File, match: re.Match[bytes]) -> 'Violation':
+        """Describe the violation represented by a match of the regex."""
+
+
+@dataclass(frozen=True, slots=True)
 class Violation:
     """A violation of a pattern and how to fix it."""
 
@@ -99,8 +362,15 @@ class Violation:
     # The lines that would fix the violation if used to replace the "before" lines.
     after: list[str] | None
 
-    def __post_init__(self) -> None:
-        if self.before is not None:
-            assert all(line[-1] == '\n' for line in self.before)
-        if self.after is not None:
-            assert all(line[-1] == '\n' for line in self.after)
+    # The checks are only defined when assertions are enabled, so that "python -O"
+    # does not even pay for the call.
+    if __debug__:
+
+        def __post_init__(self) -> None:
+            # Only the last line of a file may lack a newline, so only the last of the
+            # lines given can.
+            if self.before is not None:
+                assert all(line[-1] == '\n' for line in self.before[:-1])
+                assert all(self.before)
+            if self.after is not None:
+                assert all(line[-1] == '\n' for line in self.after[:-1])
@@ -1,12 +1,21 @@
 import difflib
+import itertools
+import os
 import sys
 import typer
-from fend import File, Location, Pattern, Project, Violation
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from fend import File, Pattern, Project, Violation
+from fend.cache import Cache
+from fend.cache import default_path as default_cache_path
 from fend.stock import general, make
-from pathlib import Path
 from typing import Optional
 
 _app = typer.Typer()
+# Differ objects hold no per-comparison state, so one can be shared.
+_DIFFER = difflib.Differ()
+# When writing to a terminal, the number of violations reported between flushes.
+_TTY_FLUSH_INTERVAL = 100
 
 
 @_app.callback()
@@ -19,78 +28,230 @@ def _documentation():
     # This function exists only to provid the text above for the CLI.
 
 
-def _fix(project: Project, patterns: list[Pattern]) -> None:
+def _apply_fixes(file: File, violations: list[Violation]) -> bool:
+    """Apply the non-overlapping fixes to the file, writing it at most once.
+
+    Returns True if any fixes were left unapplied because they overlapped another fix.
+    """
+    lines = list(file.lines)
+    covered: set[int] = set()
+    deferred = False
+    # Working from the bottom of the file up means that applying one fix never shifts
+    # the line numbers of the fixes still to be applied.
+    for violation in sorted(violations, key=lambda v: -v.location.line):
+        line_index = violation.location.line - 1
+        span = range(line_index, line_index + len(violation.before))
+        if covered.intersection(span):
+            deferred = True
+            continue
+        covered.update(span)
+        lines[span.start : span.stop] = violation.after
+    if covered:
+        file.write_lines(lines)
+    return deferred
+
+
+def _fix_file(file: File, patterns: list[Pattern]) -> None:
+    file_project = Project.from_files([file])
+    while True:
+        violations = [
+            violation
+            for pattern in patterns
+            for violation in pattern.check(file_project)
+            if violation.after is not None
+        ]
+        if not violations:
+            break
+        # Fixes from different patterns may overlap (or one may undo another), in which
+        # case only some are applied and the file is checked again.
+        if not _apply_fixes(file, violations):
+            break
+
+
+def _chunk_size(file_count: int, workers: int) -> int:
+    """Decide how many files to send to a worker process at a time."""
+    # Sending files in batches cuts the cost of communicating with the workers, while
+    # several batches per worker still lets them even out uneven amounts of work.
+    return max(1, file_count // (workers * 4))
+
+
+def _fix(project: Project, patterns: list[Pattern], workers: int = 1) -> None:
+    files = project.get_files()
+    if workers <= 1:
+        project.prime()
+        for file in files:
+            _fix_file(file, patterns)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Consume the results so that any exceptions raised by the workers propagate.
+        list(
+            executor.map(
+                _fix_file,
+                files,
+                itertools.repeat(patterns),
+                chunksize=_chunk_size(len(files), workers),
+            )
+        )
+
+
+def _check_file(
+    file: File, patterns: list[Pattern], cache: Cache | None = None
+) -> list[Violation]:
+    file_project = Project.from_files([file])
+    violations = []
     for pattern in patterns:
-        while True:
-            violations = pattern.check(project)
-            if not violations:
-                break
-            # XXX This is not great; since each check is run in isolation, they may undo
-            # a fix from a previous check.  To hack around that, we just fix one
-            # violation and then re-run the entire check.  This points to a serious
-            # deficiency in how we're modeling the problem.
-            violation = violations[0]
-            if violation.after is None:
-                continue
-            lines = violation.location.file.lines
-            line_index = violation.location.line - 1
-            lines[line_index : line_index + len(violation.before)] = violation.after
-            violation.location.file_path.write_text(''.join(lines))
-
-
-def _find_patterns():
-    return general.patterns | make.patterns
+        pattern_violations = None if cache is None else cache.get(pattern, file)
+        if pattern_violations is None:
+            pattern_violations = list(pattern.check(file_project))
+            if cache is not None:
+                cache.set(pattern, file, pattern_violations)
+        violations.extend(pattern_violations)
+    return violations
+
+
+def _check(
+    project: Project,
+    patterns: list[Pattern],
+    workers: int = 1,
+    cache: Cache | None = None,
+) -> Iterator[Violation]:
+    """Generate the violations in the project, a file at a time.
+
+    Only the violations for the file currently being reported need be held in memory.
+    """
+    files = project.get_files()
+    if workers <= 1:
+        project.prime()
+        for file in files:
+            yield from _check_file(file, patterns, cache)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for violations in executor.map(
+                _check_file,
+                files,
+                itertools.repeat(patterns),
+                itertools.repeat(cache),
+                chunksize=_chunk_size(len(files), workers),
+            ):
+                yield from violations
+
+
+def _worker_count(concurrency: str, file_count: int) -> int:
+    """Determine how many worker processes to use for the given number of files."""
+    if concurrency == 'off':
+        return 1
+    if concurrency == 'auto':
+        workers = os.cpu_count() or 1
+        # Starting worker processes has a cost, so only use them if there is enough
+        # work to spread around.
+        return workers if file_count >= workers * 2 else 1
+    try:
+        workers = int(concurrency)
+    except ValueError:
+        raise typer.BadParameter(
+            'must be "auto", "off", or a number of processes',
+            param_hint='--concurrency',
+        ) from None
+    if workers < 1:
+        raise typer.BadParameter(
+            'the number of processes must be at least 1', param_hint='--concurrency'
+        )
+    if 1 < workers and file_count < workers * 2:
+        typer.echo(
+            f'warning: {workers} processes requested for only {file_count} file(s);'
+            ' the overhead of starting them may outweigh any speedup',
+            err=True,
+        )
+    return workers
+
+
+# All of the available patterns, keyed (and ordered) by ID.
+_PATTERNS: dict[str, type[Pattern]] = {
+    pattern.id: pattern
+    for pattern in sorted(general.patterns | make.patterns, key=lambda p: p.id)
+}
 
 
 def _find_enabled_patterns(enable: list[str]) -> list[Pattern]:
+    enable_set = frozenset(enable)
     enabled_patterns = []
-    for pattern in _find_patterns():
-        if pattern.id in enable:
-            pattern_instance = pattern()
-            pattern_instance.validate()
-            enabled_patterns.append(pattern_instance)
+    for pattern_id, pattern in _PATTERNS.items():
+        if pattern_id in enable_set:
+            enabled_patterns.append(pattern())
     return enabled_patterns
 
 
 def _complete_patterns():
     """Find the list of patterns avaialble to the user.  Used in CLI completion."""
-    return [pattern.id for pattern in _find_patterns()]
+    return list(_PATTERNS)
+
+
+_concurrency_option = typer.Option(
+    'auto',
+    help='The number of processes to check files with, "auto", or "off".',
+)
 
 
 @_app.command()
 def check(
-    filespec: str = typer.Argument(...),
+    filespecs: list[str] = typer.Argument(...),
     diff: bool = typer.Option(False, help='Print a fix for each violation as a diff.'),
     enable: Optional[list[str]] = typer.Option(
         None, help='Enable the given patterns.', autocompletion=_complete_patterns
     ),
+    concurrency: str = _concurrency_option,
+    cache: bool = typer.Option(
+        False, help='Reuse the results of earlier checks (stored in ~/.cache/fend).'
+    ),
 ) -> None:
     """Check one or more files for compliance with one or more enabled patterns."""
     enabled_patterns = _find_enabled_patterns(enable or [])
-    violations = []
-    for pattern in enabled_patterns:
-        violations.extend(pattern.check(Project.from_file_path(filespec)))
+    with Project.from_file_paths(filespecs) as project:
+        workers = _worker_count(concurrency, len(project.get_files()))
+        violations = _check(
+            project,
+            enabled_patterns,
+            workers,
+            Cache(default_cache_path()) if cache else None,
+        )
+        _report(violations, diff)
+
 
-    for violation in violations:
-        print(
+def _report(violations: Iterable[Violation], diff: bool) -> None:
+    """Write a description (and optionally a diff) of each violation to stdout."""
+    # The output is collected and written all at once rather than a line at a time, but
+    # when a person is watching it is flushed periodically so that they see progress.
+    flush_every = _TTY_FLUSH_INTERVAL if sys.stdout.isatty() else None
+    chunks = []
+    for count, violation in enumerate(violations, start=1):
+        chunks.append(
             f'{violation.location.file_path}:{violation.location.line}'
-            f' {violation.summary} ({", ".join(violation.tags)})'
+            f' {violation.summary} ({", ".join(violation.tags)})\n'
         )
-        if diff:
-            differ = difflib.Differ()
-            print(''.join(list(differ.compare(violation.before, violation.after))))
+        # Not all violations come with a fix that can be shown.
+        if diff and violation.before is not None:
+            chunks.extend(_DIFFER.compare(violation.before, violation.after))
+            chunks.append('\n')
+        if flush_every is not None and count % flush_every == 0:
+            sys.stdout.write(''.join(chunks))
+            sys.stdout.flush()
+            chunks.clear()
+    sys.stdout.write(''.join(chunks))
 
 
 @_app.command()
 def fix(
-    filespec: str = typer.Argument(...),
+    filespecs: list[str] = typer.Argument(...),
     enable: Optional[list[str]] = typer.Option(
         None, help='Enable the given patterns.', autocompletion=_complete_patterns
     ),
+    concurrency: str = _concurrency_option,
 ) -> None:
     """Fix any found violations of one or more enabled patterns."""
     enabled_patterns = _find_enabled_patterns(enable or [])
-    _fix(Project.from_file_path(filespec), enabled_patterns)
+    with Project.from_file_paths(filespecs) as project:
+        workers = _worker_count(concurrency, len(project.get_files()))
+        _fix(project, enabled_patterns, workers)
 
 
 main = _app
@@ -0,0 +1,98 @@
+"""A persistent cache of the violations found in files."""
+
+import functools
+import hashlib
+import json
+import os
+import sys
+from fend import File, Location, Pattern, Violation
+from pathlib import Path
+from typing import Any
+
+# Changing the format of the cached data requires changing this so that old entries are
+# not used.
+_FORMAT_VERSION = b'2'
+
+
+def default_path() -> Path:
+    """Find the per-user directory in which to cache results."""
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'fend'
+
+
+@functools.cache
+def _code_digest(module_name: str) -> bytes:
+    """Hash the source of a module so that cached results go stale when it changes."""
+    file_name: str | None = getattr(sys.modules[module_name], '__file__', None)
+    if file_name is None:
+        # Without its source there is no telling whether a module has changed, so its
+        # results are only reused within this run.
+        return os.urandom(32)
+    return hashlib.sha256(Path(file_name).read_bytes()).digest()
+
+
+class Cache:
+    """Violations found by patterns, keyed by the contents of the files checked.
+
+    Entries are found by hashing a file's contents (along with its path and the
+    pattern), not by looking at modification times, so they survive files being touched
+    or checked out again.  Each entry is stored as JSON in its own file; unlike a pickle,
+    loading an entry can not run code, even if the cache directory is not trustworthy.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+
+    def _entry_path(self, pattern: Pattern, file: File) -> Path:
+        digest = hashlib.sha256(_FORMAT_VERSION)
+        # Results depend on fend itself as well as on the pattern's code and data.
+        digest.update(_code_digest('fend'))
+        digest.update(_code_digest(type(pattern).__module__))
+        digest.update(hashlib.sha256(pattern.fingerprint()).digest())
+        for part in pattern.id, str(file.path):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        digest.update(file.digest)
+        return self.path / f'{digest.hexdigest()}.json'
+
+    def get(self, pattern: Pattern, file: File) -> list[Violation] | None:
+        """Find the cached violations of the pattern in the file, if any."""
+        try:
+            with self._entry_path(pattern, file).open('rb') as f:
+                return [_decode_violation(entry) for entry in json.load(f)]
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+
+    def set(self, pattern: Pattern, file: File, violations: list[Violation]) -> None:
+        """Store the violations of the pattern found in the file."""
+        entry_path = self._entry_path(pattern, file)
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers (or writers) never
+        # see a partially written entry.
+        temporary_path = entry_path.with_suffix(f'.{os.getpid()}.tmp')
+        with temporary_path.open('w', encoding='utf-8') as f:
+            json.dump([_encode_violation(violation) for violation in violations], f)
+        os.replace(temporary_path, entry_path)
+
+
+def _encode_violation(violation: Violation) -> dict[str, Any]:
+    location = violation.location
+    return {
+        'tags': violation.tags,
+        'summary': violation.summary,
+        'file_path': str(location.file_path),
+        'line': location.line,
+        'column': location.column,
+        'before': violation.before,
+        'after': violation.after,
+    }
+
+
+def _decode_violation(entry: dict[str, Any]) -> Violation:
+    return Violation(
+        tuple(entry['tags']),
+        entry['summary'],
+        Location(Path(entry['file_path']), entry['line'], entry['column']),
+        before=entry['before'],
+        after=entry['after'],
+    )
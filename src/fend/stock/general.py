@@ -1,33 +1,41 @@
-import abc
-from dataclasses import dataclass
-from fend import File, Location, Pattern, Project, Violation
-from pathlib import Path
+import re
+from fend import File, Location, RegexPattern, Violation
 from typing import Any
 
+# Trailing whitespace on a line, and the line's ending (if it has one).
+_TRAILING_WHITESPACE = re.compile(r'[ \t\f\v]+(\r?\n)?\Z')
 
-class TrailingWhitespace(Pattern):
+
+class TrailingWhitespace(RegexPattern):
     """This pattern identifies lines with trailing whitespace."""
 
     id = 'trailing-whitespace'
 
-    def check(self, project: Project) -> list[Violation]:
-        files = project.get_files()
-        violations = []
-        for file in files:
-            for line_index, line in enumerate(file.lines):
-                after_line = line.rstrip() + '\n'
-                if after_line != line:
-                    location = Location(file.path, line=line_index + 1, column=1)
-                    violations.append(
-                        Violation(
-                            ('trailing-whitespace',),
-                            'trailing whitespace',
-                            location,
-                            before=[line],
-                            after=[after_line],
-                        )
-                    )
-        return violations
+    # A whitespace character at the end of a line (before any CRLF or LF line ending, or
+    # at the end of a file that lacks a final newline).  Only a single character is
+    # matched; a "one or more" match makes the regex engine re-scan every run of
+    # indentation from each of its starting positions.
+    regex = rb'[ \t\f\v](?=\r?\n|\Z)'
+    required_substrings = tuple(
+        whitespace + ending
+        for whitespace in (b' ', b'\t', b'\f', b'\v')
+        for ending in (b'\n', b'\r\n')
+    )
+
+    def may_match(self, raw: Any) -> bool:
+        # The last line of the file may not end with a newline.
+        return raw[-1:] in (b' ', b'\t', b'\f', b'\v') or super().may_match(raw)
+
+    def make_violation(self, file: File, match: re.Match[bytes]) -> Violation:
+        line_no = file.line_of(match.start())
+        before_line = file.get_line(line_no)
+        return Violation(
+            ('trailing-whitespace',),
+            'trailing whitespace',
+            Location(file.path, line=line_no, column=1),
+            before=[before_line],
+            after=[_TRAILING_WHITESPACE.sub(r'\1', before_line)],
+        )
 
 
 patterns: set = {TrailingWhitespace}
@@ -1,31 +1,93 @@
 """Fend patterns for Makefiles."""
 
-import re
-import subprocess
-import tree_sitter
+import functools
+import hashlib
+import mmap
+import weakref
 from fend import File, Location, Pattern, Project, Violation
 from pathlib import Path
 from tree_sitter import Language, Parser
-from typing import Any
+from typing import Any, Iterator
 
-MAKE_LANGUAGE = tree_sitter.Language('build/my-languages.so', 'make')
+# The compiled Makefile grammar.
+_LANGUAGE_PATH = 'build/my-languages.so'
 
 
-def _find_nodes_by_type(root, type_: str):
-    results = []
+# Loading the grammar, creating a parser, and compiling queries all have a cost, so
+# each is done only once, and not until a Makefile is actually examined.
+@functools.cache
+def _language() -> Language:
+    return Language(_LANGUAGE_PATH, 'make')
 
-    def find_nodes(node):
-        if node.type == type_:
-            results.append(node)
-        for child in node.children:
-            find_nodes(child)
 
-    find_nodes(root)
-    return results
+@functools.cache
+def _language_digest() -> bytes:
+    """Hash the grammar, since the results of the patterns depend on it."""
+    return hashlib.sha256(Path(_LANGUAGE_PATH).read_bytes()).digest()
 
 
-def _node_text(node):
-    return node.text.decode('utf8')
+@functools.cache
+def _parser() -> Parser:
+    parser = Parser()
+    parser.set_language(_language())
+    return parser
+
+
+@functools.cache
+def _query(source: str) -> Any:  # XXX really a tree-sitter query
+    """Compile a query; running one is much quicker than walking the tree in Python."""
+    return _language().query(source)
+
+
+# The contents of each file that has been parsed as both the File provided them and as
+# bytes, and the resulting tree.  Entries are dropped along with their File, so neither
+# the sources nor the trees outlive the project that read them.
+_trees: weakref.WeakKeyDictionary[
+    File, tuple[Any, bytes, Any]
+] = weakref.WeakKeyDictionary()
+# The function calls found in each file, and the tree they were found in.
+_calls: weakref.WeakKeyDictionary[
+    File, tuple[Any, tuple[Any, ...]]
+] = weakref.WeakKeyDictionary()
+
+
+def _find_call_arguments(call: Any) -> Iterator[Any]:  # XXX really nodes
+    """Generate the arguments of a call, but not those of calls nested within them."""
+    cursor = call.walk()
+    if not cursor.goto_first_child():
+        return
+    while True:
+        type_ = cursor.node.type
+        if type_ == 'argument':
+            yield cursor.node
+        # Nothing within an argument is an argument of this call.
+        elif type_ != 'function_call' and cursor.goto_first_child():
+            continue
+        while not cursor.goto_next_sibling():
+            if not cursor.goto_parent():
+                return
+
+
+def _find_nodes_by_type(root: Any, type_: str) -> Iterator[Any]:  # XXX really nodes
+    """Generate the nodes of a type at or below the root, in document order."""
+    # Walking with a cursor avoids both recursion and creating a list of the children of
+    # every node.
+    cursor = root.walk()
+    while True:
+        if cursor.node.type == type_:
+            yield cursor.node
+        if cursor.goto_first_child() or cursor.goto_next_sibling():
+            continue
+        while True:
+            if not cursor.goto_parent():
+                return
+            if cursor.goto_next_sibling():
+                break
+
+
+def _node_text(node: Any, source: bytes | mmap.mmap) -> str:  # XXX really a node
+    # Slicing the source the tree was parsed from is cheaper than node.text.
+    return str(source[node.start_byte : node.end_byte], 'utf-8')
 
 
 # TODO
@@ -43,34 +105,117 @@ def _node_text(node):
 # https://github.com/mrtazz/checkmake
 
 
-def _extract_targets(text: str) -> str:
+def _parse_file(file: File) -> Any:  # XXX really a tree-sitter tree
+    """Parse a Makefile, reusing the previous parse of the file where possible.
+
+    This lets every pattern that looks at a file share a single parse of it and, if the
+    file has changed since it was last parsed (e.g., by a fix), the new parse is done
+    incrementally from the old one.
+    """
+    raw = file.raw
+    cached = _trees.get(file)
+    # If the file has not been re-read since it was parsed, its contents need not be
+    # copied (from a memory map) or compared.
+    if cached is not None and cached[0] is raw:
+        return cached[2]
+    source = bytes(raw)
+    if cached is None:
+        tree = _parser().parse(source)
+    else:
+        _, old_source, old_tree = cached
+        if old_source != source:
+            _edit_tree(old_tree, old_source, source)
+            tree = _parser().parse(source, old_tree)
+        else:
+            tree = old_tree
+    _trees[file] = (raw, source, tree)
+    return tree
+
+
+def _find_file_calls(file: File) -> tuple[Any, ...]:  # XXX really nodes
+    """Find the function calls in a Makefile, searching each parse of it only once.
+
+    Every pattern interested in calls can share the result, as with the parse itself.
+    """
+    tree = _parse_file(file)
+    cached = _calls.get(file)
+    if cached is not None and cached[0] is tree:
+        return cached[1]
+    calls = tuple(_extract_call_nodes(tree))
+    _calls[file] = (tree, calls)
+    return calls
+
+
+def _edit_tree(tree: Any, old: bytes, new: bytes) -> None:  # XXX really a tree
+    """Describe the change from the old source to the new one to a tree parsed from old.
+
+    The change is described as a single edit spanning everything between the longest
+    common prefix and suffix of the two.
+    """
+    start = _common_prefix_length(old, new)
+    # The suffix may not overlap the prefix.
+    limit = min(len(old), len(new)) - start
+    suffix_length = _common_prefix_length(old[::-1][:limit], new[::-1][:limit])
+    old_end = len(old) - suffix_length
+    new_end = len(new) - suffix_length
+    tree.edit(
+        start_byte=start,
+        old_end_byte=old_end,
+        new_end_byte=new_end,
+        start_point=_point(old, start),
+        old_end_point=_point(old, old_end),
+        new_end_point=_point(new, new_end),
+    )
+
+
+def _common_prefix_length(a: bytes, b: bytes) -> int:
+    # A binary search comparing slices keeps the byte-by-byte work in C.
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _point(source: bytes, offset: int) -> tuple[int, int]:
+    """Find the (zero-based) row and column of a byte offset, as tree-sitter does."""
+    row = source.count(b'\n', 0, offset)
+    column = offset - (source.rfind(b'\n', 0, offset) + 1)
+    return (row, column)
+
+
+def _extract_targets(text: str) -> list[str]:
     """Extract Make targets from a Makefile."""
-    parser = Parser()
-    parser.set_language(MAKE_LANGUAGE)
-    tree = parser.parse(bytes(text, 'utf8'))
-    return list(map(_node_text, _find_nodes_by_type(tree.root_node, 'targets')))
+    source = text.encode('utf-8')
+    return list(_extract_tree_targets(_parser().parse(source), source))
 
 
-def _extract_call_nodes(lines: str) -> Any:  # XXX really a tree-sitter node
-    """Extract Make function calls from a (potentially) multi-line string."""
-    parser = Parser()
-    parser.set_language(MAKE_LANGUAGE)
-    tree = parser.parse(bytes(lines, 'utf8'))
-    return _find_nodes_by_type(tree.root_node, 'function_call')
+def _extract_tree_targets(
+    tree: Any, source: bytes | mmap.mmap
+) -> Iterator[str]:  # XXX really a tree
+    """Generate the targets of a Makefile, given its source and the parse of it."""
+    for node, _ in _query('(rule (targets) @targets)').captures(tree.root_node):
+        yield _node_text(node, source)
 
 
-def _extract_call_arguments(call: str) -> str:
-    """Extract the arguments from a Make function call."""
-    assert call.startswith('$(call ')
-    parser = Parser()
-    parser.set_language(MAKE_LANGUAGE)
-    tree = parser.parse(bytes(call, 'utf8'))
-    assert tree.root_node.child_count == 1, 'text must be simple'
-    assert tree.root_node.children[0].type == 'function_call', 'text must be a call'
-    arguments = _find_nodes_by_type(tree.root_node, 'argument')
-    return list(map(_node_text, arguments))
+def _extract_call_nodes(tree: Any) -> Iterator[Any]:  # XXX really tree and nodes
+    """Generate the Make function calls in a parsed Makefile."""
+    for node, _ in _query('(function_call) @call').captures(tree.root_node):
+        yield node
 
 
+def _extract_call_arguments(call: str) -> list[str]:
+    """Extract the arguments from a Make function call (and any calls within it)."""
+    if not call.startswith('$(call '):
+        return []
+    source = call.encode('utf-8')
+    # The text starts with the call, so the call is the first node in the tree.
+    call_node = _parser().parse(source).root_node.children[0]
+    arguments = _find_nodes_by_type(call_node, 'argument')
+    return [_node_text(argument, source) for argument in arguments]
 
 
 class RequiredTargets(Pattern):
@@ -80,29 +225,24 @@ class RequiredTargets(Pattern):
 
     required_targets = {'build', 'lint', 'test', 'check', 'clean'}
 
-    def check(self, project: Project) -> list[Violation]:
-        violations = []
-        for file in project.files:
-            for required_target in self.required_targets:
-                targets = _extract_targets(file.text)
-                if required_target not in targets:
-                    location = Location(file.path, line=1, column=1)
-                    violations.append(
-                        Violation(
-                            (self.id,),
-                            f'missing required target in Makefile: {required_target}',
-                            location,
-                            before=None,
-                            after=None,
-                        )
-                    )
-        return violations
-
-
-def get_children_by_type(
-    node: Any, child_type: str
-) -> list[Any]:  # XXX really list[node]
-    return [child for child in node.children if child.type == child_type]
+    def fingerprint(self) -> bytes:
+        return _language_digest()
+
+    def check(self, project: Project) -> Iterator[Violation]:
+        for file in project.get_files():
+            targets = _extract_tree_targets(_parse_file(file), file.raw)
+            missing = self.required_targets.difference(targets)
+            if not missing:
+                continue
+            location = Location(file.path, line=1, column=1)
+            for required_target in sorted(missing):
+                yield Violation(
+                    (self.id,),
+                    f'missing required target in Makefile: {required_target}',
+                    location,
+                    before=None,
+                    after=None,
+                )
 
 
 def line_and_column_from_node(node: Any) -> tuple[int, int]:  # XXX really node
@@ -110,46 +250,65 @@ def line_and_column_from_node(node: Any) -> tuple[int, int]:  # XXX really node
     return (line + 1, column + 1)
 
 
+# How a use of $(call ...) can start.
+_CALL_STARTS = {b'$(call ', b'$(call\t', b'${call ', b'${call\t'}
+
+
 class SuperfolousSpaceInCall(Pattern):
     """This pattern identifies and fixes extra spaces in uses of $(call ...)."""
 
     id = 'make/superfluous-space-in-call'
 
-    def check(self, project: Project) -> list[Violation]:
-        violations = []
-        for file in project.files:
-            for call in _extract_call_nodes(file.text):
-                for argument in _find_nodes_by_type(call, 'argument'):
-                    text = argument.text.decode('utf-8')
-                    if not text.startswith(' '):
+    def fingerprint(self) -> bytes:
+        return _language_digest()
+
+    def check(self, project: Project) -> Iterator[Violation]:
+        for file in project.get_files():
+            raw = file.raw
+            # A file without uses of $(call ...) need not be parsed.
+            if raw.find(b'$(call') == -1 and raw.find(b'${call') == -1:
+                continue
+            for call in _find_file_calls(file):
+                # Other functions (e.g., $(subst ...)) parse the same way, but spaces in
+                # their arguments can be significant.
+                if raw[call.start_byte : call.start_byte + 7] not in _CALL_STARTS:
+                    continue
+                for argument in _find_call_arguments(call):
+                    # Looking at the first byte in the file avoids copying the text of
+                    # every argument out of the tree.
+                    start = argument.start_byte
+                    if raw[start : start + 1] != b' ':
                         continue
 
                     line_no, column_no = line_and_column_from_node(argument)
                     # If the argument is entirely on one line, it is easy to make make a
                     # before and after.
                     if argument.start_point[0] == argument.end_point[0]:
+                        # Looking up a line is cheap (the file indexes its lines), but
+                        # tree-sitter's columns count bytes, so the line is edited as
+                        # bytes.
                         before_line = file.get_line(line_no)
+                        line = before_line.encode('utf-8')
                         before = [before_line]
                         after = [
-                            before_line[: argument.start_point[1]]
-                            + text.lstrip()
-                            + before_line[argument.end_point[1] :]
+                            (
+                                line[: argument.start_point[1]]
+                                + argument.text.lstrip()
+                                + line[argument.end_point[1] :]
+                            ).decode('utf-8')
                         ]
                     else:
                         before = None
                         after = None
 
                     location = Location(file.path, line=line_no, column=column_no)
-                    violations.append(
-                        Violation(
-                            (self.id,),
-                            f'function call includes superfluous space',
-                            location,
-                            before=before,
-                            after=after,
-                        )
+                    yield Violation(
+                        (self.id,),
+                        'function call includes superfluous space',
+                        location,
+                        before=before,
+                        after=after,
                     )
-        return violations
 
 
 patterns: set = {RequiredTargets, SuperfolousSpaceInCall}
@@ -0,0 +1,48 @@
+import unittest
+from ..general import TrailingWhitespace
+from fend import Location, Project, Violation
+from pathlib import Path
+
+_RULE = TrailingWhitespace()
+
+
+def _violation(line: int, before: str, after: str) -> Violation:
+    return Violation(
+        tags=('trailing-whitespace',),
+        summary='trailing whitespace',
+        location=Location(file_path=Path('/tmp/fake/path'), line=line, column=1),
+        before=[before],
+        after=[after],
+    )
+
+
+class TestTrailingWhitespace(unittest.TestCase):
+    """Tests for the TrailingWhitespace pattern."""
+
+    def test_no_trailing_whitespace(self):
+        """Lines without trailing whitespace generate no messages."""
+        text = 'a b\n\tc\n'
+        self.assertEqual(list(_RULE.check(Project.from_text(text))), [])
+
+    def test_trailing_whitespace(self):
+        """Each line with trailing whitespace generates a single message."""
+        text = 'a \nb\nc \t\n'
+        self.assertEqual(
+            list(_RULE.check(Project.from_text(text))),
+            [_violation(1, 'a \n', 'a\n'), _violation(3, 'c \t\n', 'c\n')],
+        )
+
+    def test_crlf_line_endings(self):
+        """CRLF line endings are not whitespace to be removed, and are preserved."""
+        text = 'a\r\nb  \r\nc\r\n'
+        self.assertEqual(
+            list(_RULE.check(Project.from_text(text))),
+            [_violation(2, 'b  \r\n', 'b\r\n')],
+        )
+
+    def test_no_final_newline(self):
+        """Trailing whitespace on a last line that lacks a newline is found."""
+        text = 'x\ny  '
+        self.assertEqual(
+            list(_RULE.check(Project.from_text(text))), [_violation(2, 'y  ', 'y')]
+        )
@@ -1,15 +1,44 @@
 import fend
+import gc
+import os
 import textwrap
 import unittest
 from ..make import (
     SuperfolousSpaceInCall,
     _extract_call_arguments,
     _extract_targets,
+    _parse_file,
+    _trees,
 )
 from fend import File, Location, Pattern, Project, Violation
 from pathlib import Path
 
-corpus_path = Path(fend.__file__).parent.joinpath('test/corpus/make/')
+corpus_path = os.path.join(os.path.dirname(fend.__file__), 'test', 'corpus', 'make')
+TRAILING_MK = os.path.join(corpus_path, 'trailing-whitespace.mk')
+# Read once, at import, so that tests using the corpus need not touch the disk.
+with open(TRAILING_MK, encoding='utf-8') as f:
+    TRAILING_TEXT = f.read()
+
+# Patterns keep no state between checks, so one instance serves every test.
+_RULE = SuperfolousSpaceInCall()
+
+EXPECTED_NESTED_ARGUMENTS = [
+    'one',
+    ' $(eval $(value "string"))',
+    '$(value "string")',
+    '"string"',
+    'three ',
+]
+
+# Calls and the arguments that should be extracted from them.
+ARGUMENT_CASES = (
+    ('$(call one)', ['one']),
+    ('$(call one,two,three)', ['one', 'two', 'three']),
+    # leading whitespace in arguments
+    ('$(call one, two,  three)', ['one', ' two', '  three']),
+    # trailing whitespace in arguments
+    ('$(call one ,two  ,three   )', ['one ', 'two  ', 'three   ']),
+)
 
 
 class Test_extract_targets(unittest.TestCase):
@@ -34,39 +63,39 @@ class Test_extract_targets(unittest.TestCase):
         self.assertEqual(_extract_targets(text), ['check'])
 
 
+class Test_parse_file(unittest.TestCase):
+    """Tests for the _parse_file() function."""
+
+    def test_reparse(self):
+        """A file that has not changed is not parsed again."""
+        file = File('/tmp/fake/path', text='x := 1\n')
+        self.assertIs(_parse_file(file), _parse_file(file))
+
+    def test_parse_released(self):
+        """The parse of a file is not kept once the file itself is gone."""
+        count = len(_trees)
+        file = File('/tmp/fake/released', text='x := 1\n')
+        _parse_file(file)
+        self.assertEqual(len(_trees), count + 1)
+        del file
+        gc.collect()
+        self.assertEqual(len(_trees), count)
+
+
 class Test_extract_call_arguments(unittest.TestCase):
     """Tests for the _extract_call_arguments() function."""
 
     def test_extracting_arguments(self):
         """The _extract_call_arguments() function can extract a calls arguments."""
-        self.assertEqual(
-            _extract_call_arguments('$(call one)'),
-            ['one'],
-        )
-        self.assertEqual(
-            _extract_call_arguments('$(call one,two,three)'),
-            ['one', 'two', 'three'],
-        )
-        self.assertEqual(  # test leading whitespace in arguments
-            _extract_call_arguments('$(call one, two,  three)'),
-            ['one', ' two', '  three'],
-        )
-        self.assertEqual(  # test trailing whitespace in arguments
-            _extract_call_arguments('$(call one ,two  ,three   )'),
-            ['one ', 'two  ', 'three   '],
-        )
+        for call, expected in ARGUMENT_CASES:
+            with self.subTest(call=call):
+                self.assertEqual(_extract_call_arguments(call), expected)
 
     def test_nested_calls(self):
         """A call within a call is represented in the output."""
         self.assertEqual(
             _extract_call_arguments('$(call one, $(eval $(value "string")),three )'),
-            [
-                'one',
-                ' $(eval $(value "string"))',
-                '$(value "string")',
-                '"string"',
-                'three ',
-            ],
+            EXPECTED_NESTED_ARGUMENTS,
         )
 
     def test_multi_line_calls(self):
@@ -76,33 +105,38 @@ class Test_extract_call_arguments(unittest.TestCase):
             ['one', 'two', 'three'],
         )
 
+    def test_deeply_nested_calls(self):
+        """Calls nested far deeper than Python's recursion limit are handled."""
+        call = '$(call f,' * 1500 + 'x' + ')' * 1500
+        # Each call has two arguments: "f" and the call (or "x") within it.
+        self.assertEqual(len(_extract_call_arguments(call)), 3000)
+
+    def test_not_a_call(self):
+        """Text that is not a call has no arguments."""
+        self.assertEqual(_extract_call_arguments('$(subst a,b,c)'), [])
+
 
 class TestSuperfolousSpaceInCall(unittest.TestCase):
     """Tests for the SuperfolousSpaceInCall class."""
 
+    @classmethod
+    def setUpClass(cls):
+        cls.empty = Project.from_text('')
+        cls.trailing = Project.from_text(TRAILING_TEXT)
+
     def test_empty_makefile(self):
         """If the Makefile is completely empty, no messages are reported."""
-        self.assertEqual(
-            SuperfolousSpaceInCall().check(
-                Project.from_file_path(corpus_path / 'empty.mk')
-            ),
-            [],
-        )
+        self.assertEqual(list(_RULE.check(self.empty)), [])
 
     def test_no_extra_spaces(self):
         """If there are no extra spaces, no message is generated."""
-        self.assertEqual(
-            SuperfolousSpaceInCall().check(
-                Project.from_file_path(corpus_path / 'trailing-whitespace.mk')
-            ),
-            [],
-        )
+        self.assertEqual(list(_RULE.check(self.trailing)), [])
 
     def test_extra_spaces(self):
         """If there are extra spaces, a message describing the issue is generated."""
         text = 'x := $(call function, one)\n'
         self.assertEqual(
-            SuperfolousSpaceInCall().check(Project.from_text(text)),
+            list(_RULE.check(Project.from_text(text))),
             [
                 Violation(
                     tags=('make/superfluous-space-in-call',),
@@ -120,7 +154,7 @@ class TestSuperfolousSpaceInCall(unittest.TestCase):
         """If there are more than one extra space, a single message is generated."""
         text = 'x := $(call function,    one)\n'
         self.assertEqual(
-            SuperfolousSpaceInCall().check(Project.from_text(text)),
+            list(_RULE.check(Project.from_text(text))),
             [
                 Violation(
                     tags=('make/superfluous-space-in-call',),
@@ -134,10 +168,28 @@ class TestSuperfolousSpaceInCall(unittest.TestCase):
             ],
         )
 
+    def test_other_functions(self):
+        """Spaces in the arguments of functions other than call can matter."""
+        text = 'x := $(subst a, b,c)\n'
+        self.assertEqual(list(_RULE.check(Project.from_text(text))), [])
+
+    def test_deeply_nested_calls(self):
+        """Calls nested far deeper than Python's recursion limit can be checked."""
+        text = 'x := ' + '$(call f,' * 1500 + 'x' + ')' * 1500 + '\n'
+        self.assertEqual(list(_RULE.check(Project.from_text(text))), [])
+
+    def test_non_ascii(self):
+        """Extra spaces are removed correctly from lines with non-ASCII characters."""
+        text = 'é := $(call fünction, one)\n'
+        violations = list(_RULE.check(Project.from_text(text)))
+        self.assertEqual(len(violations), 1)
+        self.assertEqual(violations[0].before, [text])
+        self.assertEqual(violations[0].after, ['é := $(call fünction,one)\n'])
+
     def test_multiple_instances_of_extra_spaces(self):
         """More than one group of extra spaces means a message is generated for each."""
         text = 'x := $(call function, one, two, three)\n'
-        violations = SuperfolousSpaceInCall().check(Project.from_text(text))
+        violations = list(_RULE.check(Project.from_text(text)))
         self.assertEqual(len(violations), 3)
         violation_columns = []
         for violation in violations:
@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import types
+import unittest
+from fend import File, Project
+from fend.cache import Cache, _code_digest, default_path
+from fend.stock.general import TrailingWhitespace
+from pathlib import Path
+from unittest import mock
+
+
+class TestCache(unittest.TestCase):
+    """Tests for the Cache class."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = Cache(Path(self.directory.name) / 'cache')
+        self.pattern = TrailingWhitespace()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_miss(self):
+        """Nothing is found for a file that has not been cached."""
+        file = File('/tmp/fake/path', text='x \n')
+        self.assertIsNone(self.cache.get(self.pattern, file))
+
+    def test_hit(self):
+        """Violations that were stored can be retrieved."""
+        file = File('/tmp/fake/path', text='x \n')
+        violations = list(self.pattern.check(Project.from_files([file])))
+        self.cache.set(self.pattern, file, violations)
+        self.assertEqual(self.cache.get(self.pattern, file), violations)
+
+    def test_changed_contents(self):
+        """A file whose contents have changed does not use the old entry."""
+        file = File('/tmp/fake/path', text='x \n')
+        self.cache.set(self.pattern, file, [])
+        changed_file = File('/tmp/fake/path', text='y \n')
+        self.assertIsNone(self.cache.get(self.pattern, changed_file))
+
+    def test_different_path(self):
+        """Files with the same contents at different paths have separate entries."""
+        self.cache.set(self.pattern, File('/tmp/fake/one', text='x \n'), [])
+        other_file = File('/tmp/fake/two', text='x \n')
+        self.assertIsNone(self.cache.get(self.pattern, other_file))
+
+    def test_unreadable_entry(self):
+        """An entry that is not valid JSON is ignored rather than trusted."""
+        file = File('/tmp/fake/path', text='x \n')
+        self.cache.set(self.pattern, file, [])
+        (entry_path,) = self.cache.path.iterdir()
+        entry_path.write_bytes(b'\x80\x04N.')
+        self.assertIsNone(self.cache.get(self.pattern, file))
+
+    def test_default_path(self):
+        """The cache is kept in the per-user cache directory, not the project."""
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': '/tmp/fake/cache'}):
+            self.assertEqual(default_path(), Path('/tmp/fake/cache/fend'))
+
+    def test_changed_fingerprint(self):
+        """Entries are not used once the data the pattern depends on has changed."""
+        file = File('/tmp/fake/path', text='x \n')
+        self.cache.set(self.pattern, file, [])
+        with mock.patch.object(self.pattern, 'fingerprint', return_value=b'new'):
+            self.assertIsNone(self.cache.get(self.pattern, file))
+
+    def test_module_without_source(self):
+        """Results from patterns whose source can not be found are not reused later."""
+        file = File('/tmp/fake/path', text='x \n')
+        module = types.ModuleType('fake_patterns')
+        pattern_class = type(
+            'Pattern', (TrailingWhitespace,), {'__module__': 'fake_patterns'}
+        )
+        with mock.patch.dict(sys.modules, {'fake_patterns': module}):
+            self.cache.set(pattern_class(), file, [])
+            self.assertEqual(self.cache.get(pattern_class(), file), [])
+            _code_digest.cache_clear()
+            self.assertIsNone(self.cache.get(pattern_class(), file))
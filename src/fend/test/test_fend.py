@@ -0,0 +1,111 @@
+import tempfile
+import unittest
+from fend import File, Pattern, Project
+
+
+class TestFile(unittest.TestCase):
+    """Tests for the File class."""
+
+    def test_empty_file(self):
+        """An empty file has no lines."""
+        file = File('/tmp/fake/path', text='')
+        self.assertEqual(file.line_count, 0)
+        self.assertEqual(list(file.lines), [])
+
+    def test_lines(self):
+        """Lines include their line endings."""
+        file = File('/tmp/fake/path', text='one\ntwo\n')
+        self.assertEqual(file.line_count, 2)
+        self.assertEqual(list(file.lines), ['one\n', 'two\n'])
+
+    def test_no_trailing_newline(self):
+        """The last line of a file may not end in a newline."""
+        file = File('/tmp/fake/path', text='one\ntwo')
+        self.assertEqual(list(file.lines), ['one\n', 'two'])
+
+    def test_indexing_lines(self):
+        """The lines of a file can be indexed (and sliced) like a list."""
+        file = File('/tmp/fake/path', text='one\ntwo\nthree\n')
+        self.assertEqual(len(file.lines), 3)
+        self.assertEqual(file.lines[0], 'one\n')
+        self.assertEqual(file.lines[-1], 'three\n')
+        self.assertEqual(file.lines[1:], ['two\n', 'three\n'])
+        with self.assertRaises(IndexError):
+            file.lines[3]
+
+    def test_get_line(self):
+        """Individual lines can be retrieved by line number (starting at 1)."""
+        file = File('/tmp/fake/path', text='one\ntwo\nthree\n')
+        self.assertEqual(file.get_line(1), 'one\n')
+        self.assertEqual(file.get_line(3), 'three\n')
+
+    def test_non_ascii(self):
+        """Lines are decoded from UTF-8."""
+        file = File('/tmp/fake/path', text='ünïcödé\nascii\n')
+        self.assertEqual(file.get_line(1), 'ünïcödé\n')
+        self.assertEqual(file.get_line(2), 'ascii\n')
+
+    def test_line_of(self):
+        """The line containing a byte offset can be found."""
+        file = File('/tmp/fake/path', text='one\ntwo\n')
+        self.assertEqual(file.line_of(0), 1)
+        self.assertEqual(file.line_of(3), 1)  # the newline is part of the line
+        self.assertEqual(file.line_of(4), 2)
+
+    def test_digest(self):
+        """Files with the same contents have the same digest, read or not."""
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(b'some text\n')
+            f.flush()
+            self.assertEqual(
+                File(f.name).digest, File('/tmp/fake/path', text='some text\n').digest
+            )
+        self.assertNotEqual(
+            File('/tmp/fake/path', text='one\n').digest,
+            File('/tmp/fake/path', text='two\n').digest,
+        )
+
+    def test_large_file(self):
+        """Large files (which are memory mapped) are read the same as small ones."""
+        text = ''.join(f'line {line_no}\n' for line_no in range(1, 10_001))
+        with tempfile.NamedTemporaryFile() as f:
+            f.write(text.encode('utf-8'))
+            f.flush()
+            file = File(f.name)
+            self.assertEqual(file.text, text)
+            self.assertEqual(file.line_count, 10_000)
+            self.assertEqual(file.get_line(5_000), 'line 5000\n')
+            file.close()
+
+
+class TestProject(unittest.TestCase):
+    """Tests for the Project class."""
+
+    def test_binary_files_are_skipped(self):
+        """Files that are not UTF-8 text are not checked."""
+        text = File('/tmp/fake/text', text='some text\n')
+        binary = File('/tmp/fake/binary', text='\0\1\2\3')
+        project = Project.from_files([text, binary])
+        self.assertEqual(project.get_files(), [text])
+
+    def test_oversized_files_are_skipped(self):
+        """Files larger than the maximum file size are not checked."""
+        small = File('/tmp/fake/small', text='x\n')
+        large = File('/tmp/fake/large', text='x\n' * 100)
+        project = Project.from_files([small, large])
+        project.max_file_size = 10
+        self.assertEqual(project.get_files(), [small])
+
+
+class TestPattern(unittest.TestCase):
+    """Tests for the Pattern class."""
+
+    def test_id_with_space(self):
+        """Pattern IDs may not contain spaces; this is verified at definition time."""
+        with self.assertRaises(AssertionError):
+
+            class BadPattern(Pattern):
+                id = 'bad pattern'
+
+                def check(self, project):
+                    return []